@@ -9,7 +9,14 @@ LOG_DIR.mkdir(exist_ok=True)
 def setup_logger(name: str) -> logging.Logger:
     """Erstellt einen Logger mit File- und Console-Handler"""
     logger = logging.getLogger(name)
+    
+    # Bereits eingerichtet (erneuter Aufruf oder Re-Import): keine doppelten Handler
+    if logger.handlers:
+        return logger
+    
     logger.setLevel(logging.INFO)
+    # Nicht zusätzlich über den Root-Logger ausgeben
+    logger.propagate = False
     
     # Formatierung
     formatter = logging.Formatter(
@@ -272,6 +272,10 @@ class MLOpsPipeline:
         """
         Preprocess the data
         
+        Note: ``data`` is modified in place (no copy is made): missing values
+        are filled and the numerical features are overwritten with their
+        scaled values. Only the one-hot encoding builds a new frame.
+        
         Args:
             data: Input DataFrame
             
@@ -280,7 +284,7 @@ class MLOpsPipeline:
         """
         logger.info("Preprocessing data...")
         
-        processed_data = data.copy()
+        processed_data = data
         preprocessors = {}
         
         # Handle missing values
@@ -310,23 +314,29 @@ class MLOpsPipeline:
         
         # Encode categorical features (one-hot encoding)
         categorical_features = self.config["feature_engineering"]["categorical_features"]
+        encoded_columns = []
+        one_hot_frames = []
         for col in categorical_features:
             if col in processed_data.columns:
                 # Get one-hot encoded columns
                 one_hot = pd.get_dummies(processed_data[col], prefix=col, drop_first=False)
-                
+
                 # Save categories for later use
                 preprocessors[f"{col}_categories"] = {
                     "type": "one_hot_encoder",
                     "categories": list(one_hot.columns)
                 }
-                
-                # Add one-hot encoded columns to processed data
-                processed_data = pd.concat([processed_data, one_hot], axis=1)
-                
-                # Drop original categorical column
-                processed_data = processed_data.drop(col, axis=1)
-        
+
+                encoded_columns.append(col)
+                one_hot_frames.append(one_hot)
+
+        # Replace original categorical columns with their one-hot encodings in a single concat
+        if one_hot_frames:
+            processed_data = pd.concat(
+                [processed_data.drop(columns=encoded_columns), *one_hot_frames],
+                axis=1
+            )
+
         # Save preprocessors
         preprocessors_path = self.model_dir / "preprocessors.json"
         with open(preprocessors_path, "w") as f:
@@ -31,6 +31,8 @@ except ImportError:
 
 # Optional visualization dependencies
 try:
+    import matplotlib
+    matplotlib.use('Agg')  # Offscreen rendering, plots are only written to files
     import matplotlib.pyplot as plt
     import seaborn as sns
     PLOTTING_AVAILABLE = True
@@ -193,35 +195,36 @@ def plot_prediction_analysis(y_true: np.ndarray, y_pred: np.ndarray, output_dir:
         plots_dir = output_dir / "plots"
         plots_dir.mkdir(exist_ok=True)
         
-        # Actual vs Predicted scatter plot
-        plt.figure(figsize=(10, 6))
-        plt.scatter(y_true, y_pred, alpha=0.5)
-        plt.plot([y_true.min(), y_true.max()], [y_true.min(), y_true.max()], 'r--', lw=2)
-        plt.xlabel('Actual Engagement')
-        plt.ylabel('Predicted Engagement')
-        plt.title('Actual vs Predicted Engagement')
-        plt.savefig(plots_dir / "actual_vs_predicted.png")
-        plt.close()
-        
-        # Residuals plot
-        residuals = y_true - y_pred
-        plt.figure(figsize=(10, 6))
-        plt.scatter(y_pred, residuals, alpha=0.5)
-        plt.axhline(y=0, color='r', linestyle='--')
-        plt.xlabel('Predicted Engagement')
-        plt.ylabel('Residuals')
-        plt.title('Residuals Plot')
-        plt.savefig(plots_dir / "residuals.png")
-        plt.close()
-        
-        # Residuals distribution
-        plt.figure(figsize=(10, 6))
-        sns.histplot(residuals, kde=True)
-        plt.xlabel('Residuals')
-        plt.ylabel('Count')
-        plt.title('Residuals Distribution')
-        plt.savefig(plots_dir / "residuals_distribution.png")
-        plt.close()
+        # One figure is reused for all plots instead of creating one per plot
+        fig, ax = plt.subplots(figsize=(10, 6))
+        try:
+            # Actual vs Predicted scatter plot
+            ax.scatter(y_true, y_pred, alpha=0.5)
+            ax.plot([y_true.min(), y_true.max()], [y_true.min(), y_true.max()], 'r--', lw=2)
+            ax.set_xlabel('Actual Engagement')
+            ax.set_ylabel('Predicted Engagement')
+            ax.set_title('Actual vs Predicted Engagement')
+            fig.savefig(plots_dir / "actual_vs_predicted.png")
+            
+            # Residuals plot
+            residuals = y_true - y_pred
+            ax.clear()
+            ax.scatter(y_pred, residuals, alpha=0.5)
+            ax.axhline(y=0, color='r', linestyle='--')
+            ax.set_xlabel('Predicted Engagement')
+            ax.set_ylabel('Residuals')
+            ax.set_title('Residuals Plot')
+            fig.savefig(plots_dir / "residuals.png")
+            
+            # Residuals distribution
+            ax.clear()
+            sns.histplot(residuals, kde=True, ax=ax)
+            ax.set_xlabel('Residuals')
+            ax.set_ylabel('Count')
+            ax.set_title('Residuals Distribution')
+            fig.savefig(plots_dir / "residuals_distribution.png")
+        finally:
+            plt.close(fig)
         
         logger.info(f"Saved prediction analysis plots to {plots_dir}")
     except Exception as e:
@@ -4,7 +4,8 @@ import numpy as np
 import logging
 import re
 import string
-from typing import Dict, Any, Tuple
+import os
+from typing import Dict, Any, Tuple, List, Iterable
 import nltk
 from nltk.corpus import stopwords
 from nltk.tokenize import word_tokenize
@@ -13,23 +14,55 @@ from nltk.stem import WordNetLemmatizer, PorterStemmer
 # Configure logger
 logger = logging.getLogger(__name__)
 
-# Download NLTK resources if needed
+# Optional dependency for fast batch lemmatization
 try:
-    nltk.data.find('tokenizers/punkt')
-    nltk.data.find('corpora/stopwords')
-    nltk.data.find('corpora/wordnet')
-except LookupError:
-    nltk.download('punkt')
-    nltk.download('stopwords')
-    nltk.download('wordnet')
+    import spacy
+    SPACY_AVAILABLE = True
+except ImportError:
+    SPACY_AVAILABLE = False
+    logger.warning("spaCy not available, batch lemmatization will fall back to NLTK")
+
+SPACY_MODEL = 'en_core_web_sm'
+_SPACY_NLP = None
+
+# NLTK resources used by the advanced NLP helpers, keyed by their data path
+NLTK_RESOURCES = {
+    'punkt': 'tokenizers/punkt',
+    'punkt_tab': 'tokenizers/punkt_tab',  # Loaded by word_tokenize since NLTK 3.9
+    'stopwords': 'corpora/stopwords',
+    'wordnet': 'corpora/wordnet',
+}
+_NLTK_INITIALIZED = False
+
+def ensure_nltk_resources() -> None:
+    """Download missing NLTK resources once per process"""
+    global _NLTK_INITIALIZED
+    if _NLTK_INITIALIZED:
+        return
+    
+    for resource, path in NLTK_RESOURCES.items():
+        try:
+            nltk.data.find(path)
+        except LookupError:
+            logger.info(f"Downloading missing NLTK resource: {resource}")
+            if not nltk.download(resource, quiet=True):
+                # Leave the flag unset so the next call retries the download
+                raise LookupError(f"Failed to download NLTK resource: {resource}")
+    
+    _NLTK_INITIALIZED = True
 
 @step
-def preprocess_data(data: pd.DataFrame) -> pd.DataFrame:
+def preprocess_data(data: pd.DataFrame, lemmatize: bool = False) -> pd.DataFrame:
     """
     Preprocesses the social media data by cleaning text and extracting features.
     
+    The input frame is modified in place (feature columns are added to it)
+    instead of being copied first, to keep peak memory low on large datasets.
+    
     Args:
         data: Raw social media data
+        lemmatize: Also add a lemmatized_text column (spaCy, or NLTK with
+            corpora downloaded on first use if spaCy is unavailable)
         
     Returns:
         Preprocessed data with cleaned text and extracted features
@@ -40,26 +73,34 @@ def preprocess_data(data: pd.DataFrame) -> pd.DataFrame:
     
     logger.info(f"Preprocessing data with shape {data.shape}")
     
-    # Make a copy to avoid modifying the original
-    df = data.copy()
+    df = data
     
     # 1. Basic text preprocessing
     if 'content' in df.columns:
         logger.info("Performing text preprocessing...")
         
-        # Clean text
-        df['cleaned_text'] = df['content'].fillna('').astype(str).apply(clean_text)
-        
-        # Extract text features
+        content = df['content'].fillna('').astype(str)
+
+        # Clean text (each distinct text only once, reposts share their content)
+        unique_content = content.unique()
+        df['cleaned_text'] = content.map(dict(zip(unique_content, map(clean_text, unique_content))))
+
+        # Lemmatize in batches (spaCy if installed, NLTK otherwise), only on request
+        if lemmatize:
+            logger.info("Lemmatizing text...")
+            unique_cleaned = df['cleaned_text'].unique()
+            df['lemmatized_text'] = df['cleaned_text'].map(dict(zip(unique_cleaned, lemmatize_texts(unique_cleaned))))
+
+        # Extract text features (vectorized string methods instead of per-row lambdas)
         logger.info("Extracting text features...")
-        df['text_length'] = df['content'].fillna('').astype(str).apply(len)
-        df['word_count'] = df['cleaned_text'].apply(lambda x: len(x.split()) if x else 0)
-        df['has_url'] = df['content'].fillna('').astype(str).apply(lambda x: 1 if 'http' in x.lower() else 0)
-        df['has_mention'] = df['content'].fillna('').astype(str).apply(lambda x: 1 if '@' in x else 0)
-        df['has_hashtag'] = df['content'].fillna('').astype(str).apply(lambda x: 1 if '#' in x else 0)
-        
+        df['text_length'] = content.str.len()
+        df['word_count'] = df['cleaned_text'].str.split().str.len()
+        df['has_url'] = content.str.lower().str.contains('http', regex=False).astype(int)
+        df['has_mention'] = content.str.contains('@', regex=False).astype(int)
+        df['has_hashtag'] = content.str.contains('#', regex=False).astype(int)
+
         # Extract hashtags
-        df['hashtags'] = df['content'].fillna('').astype(str).apply(extract_hashtags)
+        df['hashtags'] = content.str.findall(r'#(\w+)').str.join(',')
     
     # 2. Platform-specific features
     if 'platform' in df.columns:
@@ -146,14 +187,65 @@ def extract_hashtags(text: str) -> str:
     return ','.join(hashtags)
 
 # Advanced NLP functions - can be used to extend the preprocessing
+_LEMMATIZER = None
+_STOP_WORDS = None
+
+def get_nltk_tools() -> Tuple[WordNetLemmatizer, set]:
+    """Return the NLTK lemmatizer and English stopword set, built once per process"""
+    global _LEMMATIZER, _STOP_WORDS
+    if _LEMMATIZER is None:
+        ensure_nltk_resources()
+        _LEMMATIZER = WordNetLemmatizer()
+        _STOP_WORDS = set(stopwords.words('english'))
+    return _LEMMATIZER, _STOP_WORDS
+
 def lemmatize_text(text: str) -> str:
     """Lemmatize text to reduce words to their root form"""
-    lemmatizer = WordNetLemmatizer()
+    lemmatizer, _ = get_nltk_tools()
     word_tokens = word_tokenize(text)
     return ' '.join([lemmatizer.lemmatize(word) for word in word_tokens])
 
+def lemmatize_filtered(text: str) -> str:
+    """Lemmatize text with NLTK, dropping stopwords and non-alphabetic tokens in the same pass"""
+    lemmatizer, stop_words = get_nltk_tools()
+    return ' '.join(
+        lemmatizer.lemmatize(word.lower())
+        for word in word_tokenize(text)
+        if word.isalpha() and word.lower() not in stop_words
+    )
+
+def get_spacy_nlp():
+    """Load the spaCy pipeline once per process, or return None if unavailable"""
+    global _SPACY_NLP, SPACY_AVAILABLE
+    if _SPACY_NLP is None and SPACY_AVAILABLE:
+        try:
+            # Parser and NER are not needed for lemmas
+            _SPACY_NLP = spacy.load(SPACY_MODEL, disable=['parser', 'ner'])
+        except OSError:
+            SPACY_AVAILABLE = False
+            logger.warning(f"spaCy model '{SPACY_MODEL}' not installed, falling back to NLTK")
+    return _SPACY_NLP
+
+def lemmatize_texts(texts: Iterable[str], batch_size: int = 1000) -> List[str]:
+    """
+    Lemmatize many texts at once, dropping stopwords and non-alphabetic tokens
+    
+    Both backends return lowercase, space-separated lemmas of alphabetic,
+    non-stopword tokens; the lemmas themselves can differ between spaCy and
+    WordNet (e.g. spaCy also lemmatizes verbs).
+    """
+    nlp = get_spacy_nlp()
+    if nlp is None:
+        return [lemmatize_filtered(text) for text in texts]
+    
+    docs = nlp.pipe(texts, batch_size=batch_size, n_process=os.cpu_count() or 1)
+    return [
+        ' '.join(token.lemma_.lower() for token in doc if token.is_alpha and not token.is_stop)
+        for doc in docs
+    ]
+
 def remove_stopwords(text: str) -> str:
     """Remove stopwords from text"""
-    stop_words = set(stopwords.words('english'))
+    _, stop_words = get_nltk_tools()
     word_tokens = word_tokenize(text)
-    return ' '.join([word for word in word_tokens if word.lower() not in stop_words]) 
\ No newline at end of file
+    return ' '.join([word for word in word_tokens if word.lower() not in stop_words])
@@ -1,12 +1,20 @@
 import os
+import atexit
+import queue
+import csv
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import praw
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime
 from dotenv import load_dotenv
 from pathlib import Path
 import logging
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 import psycopg2
-from psycopg2.extras import execute_values
 
 # Load environment variables
 load_dotenv()
@@ -23,50 +31,248 @@ logger.setLevel(logging.INFO)
 # File handler with rotation
 log_handler = RotatingFileHandler(
     LOG_DIR / "reddit.log",
-    maxBytes=1024*1024,  # 1MB
+    maxBytes=10*1024*1024,  # 10MB
     backupCount=5
 )
 log_handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"))
-logger.addHandler(log_handler)
 
 # Console handler for immediate feedback
 console_handler = logging.StreamHandler()
 console_handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"))
-logger.addHandler(console_handler)
+
+class LocalQueueHandler(QueueHandler):
+    """QueueHandler that passes records to an in-process QueueListener unformatted"""
+    def prepare(self, record):
+        # QueueHandler.prepare() formats the message on the calling thread so that the
+        # record can be pickled; the listener runs in this process, so that is skipped
+        return record
+
+# Log calls only enqueue records; formatting and file/console I/O happen on the listener thread.
+# Attach only once, so re-importing the module does not duplicate every log line.
+if not logger.handlers:
+    log_queue = queue.Queue(-1)
+    logger.addHandler(LocalQueueHandler(log_queue))
+    log_listener = QueueListener(log_queue, log_handler, console_handler, respect_handler_level=True)
+    log_listener.start()
+    atexit.register(log_listener.stop)
+logger.propagate = False
+
+# Connection reused across scraper runs and the connection the statements were prepared on
+_conn = None
+_prepared_conn = None
 
 def get_db_connection():
-    """Create a connection to the database specified in DATABASE_URL"""
+    """
+    Return a connection to the database specified in DATABASE_URL
+    
+    The connection is cached at module level and only re-established when it
+    was closed or fails a liveness check, so repeated runs skip the
+    connect/auth handshake.
+    """
+    global _conn
+    if _conn is not None and _conn.closed == 0:
+        try:
+            with _conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            _conn.rollback()
+            return _conn
+        except psycopg2.Error:
+            logger.warning("Cached database connection is no longer usable, reconnecting")
+            try:
+                _conn.close()
+            except psycopg2.Error:
+                pass
+    
     url = os.getenv("DATABASE_URL")
     if not url:
         raise ValueError("DATABASE_URL environment variable not set")
     
     try:
-        conn = psycopg2.connect(url)
-        return conn
+        _conn = psycopg2.connect(url)
+        return _conn
     except Exception as e:
-        logger.error(f"Database connection error: {str(e)}")
+        logger.error("Database connection error: %s", e)
         raise
 
-def remove_duplicates(posts):
+# Set once the tables and indexes exist, so the DDL runs only once per process
+_schema_ready = False
+
+def ensure_schema(conn):
+    """Create the Reddit tables and indexes if needed (once per process)"""
+    global _schema_ready
+    if _schema_ready:
+        return
+    
+    with conn.cursor() as cur:
+        # Create table if it doesn't exist
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS public.reddit_data (
+                id VARCHAR(50),
+                title TEXT,
+                text TEXT,
+                author VARCHAR(100),
+                score INTEGER,
+                created_utc BIGINT,
+                num_comments INTEGER,
+                url TEXT,
+                subreddit VARCHAR(100),
+                scraped_at TIMESTAMP,
+                PRIMARY KEY (id)
+            )
+        """)
+
+        # Unlogged staging table for the bulk load (no WAL, no indexes); LIKE keeps
+        # its columns in sync with reddit_data
+        cur.execute("""
+            CREATE UNLOGGED TABLE IF NOT EXISTS public.reddit_data_stage
+            (LIKE public.reddit_data INCLUDING DEFAULTS)
+        """)
+        
+        # Indexes for the "latest activity" lookups and per-subreddit queries
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_reddit_data_scraped_at ON public.reddit_data (scraped_at)")
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_reddit_data_subreddit_scraped_at
+            ON public.reddit_data (subreddit, scraped_at)
+        """)
+    conn.commit()
+    _schema_ready = True
+
+def prepare_statements(conn, cur):
+    """Prepare the staging merge once per connection so later runs skip parsing and planning"""
+    global _prepared_conn
+    if _prepared_conn is conn:
+        return
+    
+    # The same post can show up in several subreddit listings, DISTINCT ON keeps one
+    # row per id so ON CONFLICT never has to touch a row twice.
+    cur.execute("""
+        PREPARE reddit_merge AS
+        WITH merged AS (
+            INSERT INTO public.reddit_data (
+                id, title, text, author, score, created_utc,
+                num_comments, url, subreddit, scraped_at
+            )
+            SELECT DISTINCT ON (id)
+                   id, title, text, author, score, created_utc,
+                   num_comments, url, subreddit, scraped_at
+            FROM public.reddit_data_stage
+            ORDER BY id, scraped_at DESC
+            ON CONFLICT (id) 
+            DO UPDATE SET 
+                score = EXCLUDED.score,
+                num_comments = EXCLUDED.num_comments,
+                scraped_at = EXCLUDED.scraped_at
+            RETURNING (xmax = 0) AS inserted
+        )
+        SELECT count(*) FILTER (WHERE inserted), count(*) FROM merged
+    """)
+    _prepared_conn = conn
+
+# Subreddits fetched per run, one worker thread each
+SUBREDDITS = ["all", "popular", "trendingreddits", "trendingsubreddits"]
+
+# praw.Reddit instances are not thread-safe, so every worker thread gets its own
+_thread_local = threading.local()
+
+# HTTP session shared by all praw clients and the fetch workers, both kept for the
+# whole process so connections and clients are reused across runs
+_http_session = None
+_executor = None
+
+def create_http_session():
+    """
+    Build the requests.Session used by praw
+    
+    Asks for gzip responses and retries transient failures with backoff; the
+    connection pool has room for one connection per fetch worker.
+    """
+    session = requests.Session()
+    session.headers["Accept-Encoding"] = "gzip"
+    adapter = HTTPAdapter(
+        pool_connections=len(SUBREDDITS),
+        pool_maxsize=len(SUBREDDITS),
+        max_retries=Retry(total=3, backoff_factor=0.3)
+    )
+    session.mount("https://", adapter)
+    return session
+
+def get_http_session():
+    """Return the process-wide requests.Session, creating it on first use"""
+    global _http_session
+    if _http_session is None:
+        _http_session = create_http_session()
+    return _http_session
+
+def get_executor():
     """
-    Remove duplicate posts based on title, text, and subreddit
+    Return the process-wide fetch worker pool, creating it on first use
+    
+    The workers outlive a run, so their thread-local praw clients (and the
+    OAuth tokens those hold) are reused by the next run.
+    """
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=len(SUBREDDITS), thread_name_prefix="reddit-fetch")
+    return _executor
+
+def get_reddit_client(client_id, client_secret, user_agent):
+    """Return the praw.Reddit instance of the current thread, creating it on first use"""
+    reddit = getattr(_thread_local, "reddit", None)
+    if reddit is None:
+        reddit = praw.Reddit(
+            client_id=client_id,
+            client_secret=client_secret,
+            user_agent=user_agent,
+            requestor_kwargs={"session": get_http_session()}
+        )
+        _thread_local.reddit = reddit
+    return reddit
+
+def fetch_subreddit_posts(sub, credentials, post_limit, scrape_time):
+    """
+    Fetch the hot text posts of a single subreddit
     
     Args:
-        posts: List of post dictionaries
+        sub: Name of the subreddit
+        credentials: Keyword arguments for get_reddit_client
+        post_limit: Number of hot posts to request
+        scrape_time: Timestamp stored as scraped_at
         
     Returns:
-        List of unique posts
+        List of row tuples in reddit_data column order (id, title, text, author,
+        score, created_utc, num_comments, url, subreddit, scraped_at)
     """
-    seen = set()
-    unique_posts = []
-    
-    for post in posts:
-        key = (post["title"], post["text"], post["subreddit"])
-        if key not in seen:
-            seen.add(key)
-            unique_posts.append(post)
-    
-    return unique_posts
+    reddit = get_reddit_client(**credentials)
+    rows = []
+    for post in reddit.subreddit(sub).hot(limit=post_limit):
+        if post.is_self:  # Only collect text posts
+            rows.append((
+                str(post.id),
+                post.title,
+                post.selftext,
+                str(post.author) if post.author else None,
+                post.score,
+                int(post.created_utc),
+                post.num_comments,
+                post.url,
+                sub,
+                scrape_time
+            ))
+    return rows
+
+def write_error_status(conn, title, message, scrape_time):
+    """Upsert the status row of reddit_data with an error message"""
+    with conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO public.reddit_data 
+            (id, title, text, author, score, created_utc, num_comments, url, subreddit, scraped_at)
+            VALUES ('status_update', %s, %s, 'Scraper', 0, 0, 0, 
+                    'https://example.com', 'status', %s)
+            ON CONFLICT (id) DO UPDATE SET 
+                text = EXCLUDED.text,
+                scraped_at = EXCLUDED.scraped_at
+        """, (title, message, scrape_time))
+    conn.commit()
 
 def scrape_reddit():
     """
@@ -74,7 +280,15 @@ def scrape_reddit():
     
     Fetches hot posts from specified subreddits, processes them,
     and saves to the PostgreSQL database with duplicate handling.
+    The whole run, including error status updates, uses one connection;
+    errors are recorded in the status row and then re-raised.
+    
+    Returns:
+        Number of newly inserted posts
     """
+    conn = None
+    # One timestamp for every row and status update of this run
+    scrape_time = datetime.now()
     try:
         logger.info("Starting Reddit scraping...")
 
@@ -84,7 +298,7 @@ def scrape_reddit():
         
         if not reddit_id or not reddit_secret:
             logger.error("Reddit API credentials missing. Check your .env file.")
-            return
+            return 0
             
         # Remove any quotes and whitespace from credentials
         reddit_id = reddit_id.strip().strip('"\'')
@@ -93,153 +307,82 @@ def scrape_reddit():
         # Setup Reddit API connection
         user_agent = "python:TrendAnalysis:v1.0 (by u/YourRedditUsername)"
         
-        try:
-            reddit = praw.Reddit(
-                client_id=reddit_id,
-                client_secret=reddit_secret,
-                user_agent=user_agent
-            )
-            
-        except Exception as e:
-            logger.error(f"Failed to connect to Reddit API: {str(e)}")
-            # Create status entry on error
-            with get_db_connection() as conn:
-                with conn.cursor() as cur:
-                    cur.execute("""
-                        INSERT INTO public.reddit_data 
-                        (id, title, text, author, score, created_utc, num_comments, url, subreddit, scraped_at)
-                        VALUES ('status_update', 'Reddit API Error', %s, 'Scraper', 0, 0, 0, 
-                                'https://example.com', 'status', %s)
-                        ON CONFLICT (id) DO UPDATE SET 
-                            text = EXCLUDED.text,
-                            scraped_at = EXCLUDED.scraped_at
-                    """, (str(e), datetime.now()))
-                    conn.commit()
-            return
+        credentials = {
+            "client_id": reddit_id,
+            "client_secret": reddit_secret,
+            "user_agent": user_agent
+        }
+        
+        conn = get_db_connection()
+        ensure_schema(conn)
 
         # Configure scraping parameters
-        subreddits = ["all", "popular", "trendingreddits", "trendingsubreddits"]
         post_limit = 100
-        all_posts = []
-        scrape_time = datetime.now()
-
-        # Fetch posts from each subreddit
-        for sub in subreddits:
-            subreddit = reddit.subreddit(sub)
-            for post in subreddit.hot(limit=post_limit):
-                if post.is_self:  # Only collect text posts
-                    all_posts.append({
-                        "id": str(post.id),
-                        "subreddit": sub,
-                        "title": post.title,
-                        "text": post.selftext,
-                        "author": str(post.author) if post.author else None,
-                        "score": post.score,
-                        "created_utc": post.created_utc,
-                        "num_comments": post.num_comments,
-                        "url": post.url,
-                        "scraped_at": scrape_time
-                    })
-
-        # Remove duplicates from the current batch
-        unique_posts = remove_duplicates(all_posts)
-        logger.info(f"Found {len(unique_posts)} unique posts out of {len(all_posts)} total posts")
+        post_count = 0
+        inserted = 0
+
+        # Fetch all subreddits concurrently (the work is waiting on the Reddit API) and
+        # write each subreddit's rows straight into the CSV buffer used for COPY
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for rows in get_executor().map(
+            lambda sub: fetch_subreddit_posts(sub, credentials, post_limit, scrape_time),
+            SUBREDDITS
+        ):
+            writer.writerows(rows)
+            post_count += len(rows)
+
+        logger.info("Fetched %s posts from %s subreddits", post_count, len(SUBREDDITS))
+        
+        # Store data in PostgreSQL (duplicates are resolved by the database)
+        if post_count:
+            with conn.cursor() as cur:
+                # Stream all posts into the emptied staging table with a single COPY
+                cur.execute("TRUNCATE public.reddit_data_stage")
+                buffer.seek(0)
+                cur.copy_expert("""
+                    COPY public.reddit_data_stage (
+                        id, title, text, author, score, created_utc,
+                        num_comments, url, subreddit, scraped_at
+                    )
+                    FROM STDIN WITH (FORMAT csv, FORCE_NOT_NULL (title, text, url))
+                """, buffer)
+                
+                # Merge staged rows into reddit_data in one statement
+                prepare_statements(conn, cur)
+                cur.execute("EXECUTE reddit_merge")
+                inserted, total = cur.fetchone()
+                
+                # Count inserts vs. updates
+                updated = total - inserted
+                
+                # Planner estimate instead of COUNT(*), which would scan the whole table
+                cur.execute(
+                    "SELECT GREATEST(reltuples, 0)::bigint FROM pg_class WHERE oid = 'public.reddit_data'::regclass"
+                )
+                total_estimate = cur.fetchone()[0]
+                
+                # Commit changes and log results
+                conn.commit()
+                
+                # Calculate totals
+                logger.info("Successfully processed Reddit posts: %s new, %s updated", inserted, updated)
+                logger.info("Total posts in database (estimate): %s", total_estimate)
         
-        # Store data in PostgreSQL
-        if unique_posts:
-            with get_db_connection() as conn:
-                with conn.cursor() as cur:
-                    # Create table if it doesn't exist
-                    cur.execute("""
-                        CREATE TABLE IF NOT EXISTS public.reddit_data (
-                            id VARCHAR(50),
-                            title TEXT,
-                            text TEXT,
-                            author VARCHAR(100),
-                            score INTEGER,
-                            created_utc BIGINT,
-                            num_comments INTEGER,
-                            url TEXT,
-                            subreddit VARCHAR(100),
-                            scraped_at TIMESTAMP,
-                            PRIMARY KEY (id)
-                        )
-                    """)
-                    conn.commit()
-                    
-                    # Get count before insertion
-                    cur.execute("SELECT COUNT(*) FROM reddit_data")
-                    count_before = cur.fetchone()[0]
-                    
-                    inserted = 0
-                    updated = 0
-                    
-                    # Process each post with conflict handling
-                    for post in unique_posts:
-                        try:
-                            cur.execute("""
-                                INSERT INTO public.reddit_data (
-                                    id, title, text, author, score, created_utc,
-                                    num_comments, url, subreddit, scraped_at
-                                )
-                                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                                ON CONFLICT (id) 
-                                DO UPDATE SET 
-                                    score = EXCLUDED.score,
-                                    num_comments = EXCLUDED.num_comments,
-                                    scraped_at = EXCLUDED.scraped_at
-                                RETURNING (xmax = 0) as inserted
-                            """, (
-                                post["id"],
-                                post["title"],
-                                post["text"],
-                                post["author"],
-                                post["score"],
-                                post["created_utc"],
-                                post["num_comments"],
-                                post["url"],
-                                post["subreddit"],
-                                post["scraped_at"]
-                            ))
-                            
-                            # Check if it was an insert or update
-                            result = cur.fetchone()
-                            if result[0]:
-                                inserted += 1
-                            else:
-                                updated += 1
-                                
-                        except Exception as e:
-                            logger.error(f"Error inserting post {post['id']}: {str(e)}")
-                            continue
-                    
-                    # Commit changes and log results
-                    conn.commit()
-                    
-                    # Calculate totals
-                    logger.info(f"Successfully processed Reddit posts: {inserted} new, {updated} updated")
-                    logger.info(f"Total posts in database: {count_before + inserted}")
+        return inserted
 
     except Exception as e:
-        logger.error(f"Error in Reddit scraper: {str(e)}")
+        logger.error("Error in Reddit scraper: %s", e)
         logger.exception("Detailed error:")
         
-        # Update status record to show error
-        try:
-            with get_db_connection() as conn:
-                with conn.cursor() as cur:
-                    cur.execute("""
-                        INSERT INTO public.reddit_data 
-                        (id, title, text, author, score, created_utc, num_comments, url, subreddit, scraped_at)
-                        VALUES ('status_update', 'Reddit Scraper Error', %s, 'Scraper', 0, 0, 0, 
-                                'https://example.com', 'status', %s)
-                        ON CONFLICT (id) DO UPDATE SET 
-                            text = EXCLUDED.text,
-                            scraped_at = EXCLUDED.scraped_at
-                    """, (str(e), datetime.now()))
-                    conn.commit()
-        except Exception as status_error:
-            logger.error(f"Error updating status: {str(status_error)}")
+        # Update status record to show error, on the connection of this run
+        if conn is not None:
+            try:
+                conn.rollback()
+                write_error_status(conn, "Reddit Scraper Error", str(e), scrape_time)
+            except Exception as status_error:
+                logger.error("Error updating status: %s", status_error)
+        raise
 
 if __name__ == "__main__":
     scrape_reddit()
\ No newline at end of file
@@ -1,14 +1,16 @@
 import asyncio
 import os
+import csv
+import io
+import atexit
+import queue
 import logging
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 from TikTokApi import TikTokApi
 from dotenv import load_dotenv
 from pathlib import Path
 import psycopg2
-from psycopg2.extras import execute_values
 from datetime import datetime
-import traceback
 
 # Load environment variables
 load_dotenv()
@@ -25,46 +27,338 @@ logger.setLevel(logging.INFO)
 # File handler with rotation
 log_handler = RotatingFileHandler(
     LOG_DIR / "tiktok.log",
-    maxBytes=1024*1024,  # 1MB
+    maxBytes=10*1024*1024,  # 10MB
     backupCount=5
 )
 log_handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"))
-logger.addHandler(log_handler)
 
 # Console handler for immediate feedback
 console_handler = logging.StreamHandler()
 console_handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"))
-logger.addHandler(console_handler)
+
+class LocalQueueHandler(QueueHandler):
+    """QueueHandler that passes records to an in-process QueueListener unformatted"""
+    def prepare(self, record):
+        # QueueHandler.prepare() formats the message on the calling thread so that the
+        # record can be pickled; the listener runs in this process, so that is skipped
+        return record
+
+# Log calls only enqueue records; formatting and file/console I/O happen on the listener thread.
+# Attach only once, so re-importing the module does not duplicate every log line.
+if not logger.handlers:
+    log_queue = queue.Queue(-1)
+    logger.addHandler(LocalQueueHandler(log_queue))
+    log_listener = QueueListener(log_queue, log_handler, console_handler, respect_handler_level=True)
+    log_listener.start()
+    atexit.register(log_listener.stop)
+logger.propagate = False
+
+# Connection reused across scraper runs
+_conn = None
 
 def get_db_connection():
-    """Create a connection to the database specified in DATABASE_URL"""
+    """
+    Return a connection to the database specified in DATABASE_URL
+    
+    The connection is cached at module level and only re-established when it
+    was closed or fails a liveness check, so repeated runs skip the
+    connect/auth handshake.
+    """
+    global _conn
+    if _conn is not None and _conn.closed == 0:
+        try:
+            with _conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            _conn.rollback()
+            return _conn
+        except psycopg2.Error:
+            logger.warning("Cached database connection is no longer usable, reconnecting")
+            try:
+                _conn.close()
+            except psycopg2.Error:
+                pass
+    
     url = os.getenv("DATABASE_URL")
     if not url:
         raise ValueError("DATABASE_URL environment variable not set")
     
     try:
-        conn = psycopg2.connect(url)
-        return conn
+        _conn = psycopg2.connect(url)
+        return _conn
     except Exception as e:
-        logger.error(f"Database connection error: {str(e)}")
+        logger.error("Database connection error: %s", e)
         raise
 
+# Column order of tiktok_data and of the row tuples built by trending_videos
+VIDEO_COLUMNS = [
+    "id", "description", "author_username", "author_id", "likes", "shares",
+    "comments", "plays", "video_url", "created_time", "scraped_at"
+]
+
+# Set once the table and indexes exist, so the DDL runs only once per process
+_schema_ready = False
+
+def ensure_schema(conn):
+    """Create the TikTok table and indexes if needed (once per process)"""
+    global _schema_ready
+    if _schema_ready:
+        return
+    
+    with conn.cursor() as cur:
+        # Create table if it doesn't exist
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS public.tiktok_data (
+                id VARCHAR(50),
+                description TEXT,
+                author_username VARCHAR(100),
+                author_id VARCHAR(50),
+                likes INTEGER,
+                shares INTEGER,
+                comments INTEGER,
+                plays INTEGER,
+                video_url TEXT,
+                created_time BIGINT,
+                scraped_at TIMESTAMP,
+                PRIMARY KEY (id)
+            )
+        """)
+        
+        # Index for the "latest activity" lookups
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_tiktok_data_scraped_at ON public.tiktok_data (scraped_at)")
+    conn.commit()
+    _schema_ready = True
+
+# Upper bound for concurrent detail requests, to stay clear of MS_TOKEN throttling
+MAX_CONCURRENT_REQUESTS = 8
+
+async def resolve_video_info(video, semaphore):
+    """
+    Return the data dictionary of a trending video
+    
+    The trending feed usually already contains the statistics; only videos
+    without them are fetched again, limited by the shared semaphore.
+    """
+    info = video.as_dict
+    if info.get("stats"):
+        return info
+    async with semaphore:
+        return await video.info()
+
+def store_videos(rows):
+    """
+    Upsert the collected videos into tiktok_data
+    
+    Blocking (psycopg2); trending_videos runs it via asyncio.to_thread.
+    
+    Args:
+        rows: List of video row tuples in VIDEO_COLUMNS order
+        
+    Returns:
+        Number of newly inserted videos
+    """
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            ensure_schema(conn)
+
+            # Stream the batch into a transaction-scoped staging table with COPY
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(rows)
+            buffer.seek(0)
+            cur.execute("""
+                CREATE TEMP TABLE tiktok_data_stage
+                (LIKE public.tiktok_data INCLUDING DEFAULTS) ON COMMIT DROP
+            """)
+            cur.copy_expert("""
+                COPY tiktok_data_stage (
+                    id, description, author_username, author_id,
+                    likes, shares, comments, plays, video_url,
+                    created_time, scraped_at
+                )
+                FROM STDIN WITH (FORMAT csv, FORCE_NOT_NULL (description))
+            """, buffer)
+
+            # Merge staged rows into tiktok_data in one statement
+            cur.execute("""
+                WITH merged AS (
+                    INSERT INTO public.tiktok_data (
+                        id, description, author_username, author_id,
+                        likes, shares, comments, plays, video_url,
+                        created_time, scraped_at
+                    )
+                    SELECT id, description, author_username, author_id,
+                           likes, shares, comments, plays, video_url,
+                           created_time, scraped_at
+                    FROM tiktok_data_stage
+                    ON CONFLICT (id) 
+                    DO UPDATE SET 
+                        likes = EXCLUDED.likes,
+                        shares = EXCLUDED.shares,
+                        comments = EXCLUDED.comments,
+                        plays = EXCLUDED.plays,
+                        scraped_at = EXCLUDED.scraped_at
+                    RETURNING (xmax = 0) AS inserted
+                )
+                SELECT count(*) FILTER (WHERE inserted), count(*) FROM merged
+            """)
+
+            # Inserts vs. updates are counted by the merge itself, one row comes back
+            inserted, total = cur.fetchone()
+            updated = total - inserted
+
+            # Planner estimate instead of COUNT(*), which would scan the whole table
+            cur.execute(
+                "SELECT GREATEST(reltuples, 0)::bigint FROM pg_class WHERE oid = 'public.tiktok_data'::regclass"
+            )
+            total_estimate = cur.fetchone()[0]
+
+            # Commit changes and log results
+            conn.commit()
+
+            logger.info("Successfully processed TikTok videos: %s new, %s updated", inserted, updated)
+            logger.info("Total videos in database (estimate): %s", total_estimate)
+            return inserted
+
+def write_error_status(message, scrape_time):
+    """Upsert the status row of tiktok_data with an error message (blocking)"""
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO public.tiktok_data 
+                (id, description, author_username, author_id, likes, shares, comments, plays, video_url, created_time, scraped_at)
+                VALUES ('status_update', %s, 'TikTokScraper', '0', 0, 0, 0, 0, 'https://example.com', 0, %s)
+                ON CONFLICT (id) DO UPDATE SET 
+                    description = EXCLUDED.description,
+                    scraped_at = EXCLUDED.scraped_at
+            """, (message, scrape_time))
+            conn.commit()
+
+# Videos requested from the trending feed, rows per database batch (well below the
+# feed size, so batches are written while the feed is still being paged) and upper
+# bound for rows waiting in the queue
+FEED_COUNT = 30
+BATCH_SIZE = 10
+ROW_QUEUE_SIZE = 64
+
+def build_video_row(info, scrape_time):
+    """Return the tiktok_data row tuple (VIDEO_COLUMNS order) of a video data dictionary"""
+    author = info.get("author") or {}
+    stats = info.get("stats") or {}
+    return (
+        info.get("id"),
+        info.get("desc"),
+        author.get("uniqueId"),
+        author.get("id"),
+        stats.get("diggCount"),
+        stats.get("shareCount"),
+        stats.get("commentCount"),
+        stats.get("playCount"),
+        (info.get("video") or {}).get("downloadAddr"),
+        info.get("createTime"),
+        scrape_time
+    )
+
+async def queue_video_row(video, semaphore, row_queue, videos_by_id, scrape_time):
+    """Resolve one video and queue its row as soon as the details are available"""
+    try:
+        info = await resolve_video_info(video, semaphore)
+        video_id = info.get("id")
+        
+        # Rows without an ID would fail the primary key and abort the whole batch
+        if not video_id:
+            logger.warning("Skipping video without ID")
+            return
+        
+        # Skip if we've already queued this video in this run
+        if video_id in videos_by_id:
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Skipping duplicate video: %s", video_id)
+            return
+        
+        row = build_video_row(info, scrape_time)
+        videos_by_id[video_id] = row
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Processing video %d: %s", len(videos_by_id), video_id)
+        
+        await row_queue.put(row)
+    except Exception as e:
+        logger.error("Error processing video: %s", e)
+        # exc_info is only rendered when DEBUG is enabled
+        logger.debug("Detailed error:", exc_info=True)
+
+async def produce_video_rows(api, row_queue, scrape_time):
+    """
+    Page through the trending feed and queue one row per unique video
+    
+    Every video gets its own task, which queues the row as soon as the video
+    is resolved, so rows reach the consumer while the feed is still being
+    paged. A None sentinel marks the end of the feed.
+    """
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    videos_by_id = {}  # Unique videos of this run in queue order, keyed by video ID
+    tasks = []
+    try:
+        async for video in api.trending.videos(count=FEED_COUNT):
+            tasks.append(asyncio.create_task(
+                queue_video_row(video, semaphore, row_queue, videos_by_id, scrape_time)
+            ))
+        await asyncio.gather(*tasks)
+    finally:
+        # Do not leave detail requests running if the producer stops early
+        for task in tasks:
+            task.cancel()
+    
+    await row_queue.put(None)
+
+async def store_video_batches(row_queue):
+    """
+    Upsert queued rows in batches of BATCH_SIZE until the None sentinel arrives
+    
+    psycopg2 blocks, so every batch is written in a worker thread and the
+    event loop stays free for the producer.
+    
+    Returns:
+        Tuple of (rows stored, rows newly inserted)
+    """
+    stored = 0
+    inserted = 0
+    batch = []
+    while True:
+        row = await row_queue.get()
+        if row is None:
+            break
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            inserted += await asyncio.to_thread(store_videos, batch)
+            stored += len(batch)
+            batch = []
+    
+    if batch:
+        inserted += await asyncio.to_thread(store_videos, batch)
+        stored += len(batch)
+    return stored, inserted
+
 async def trending_videos():
     """
     Scrape trending videos from TikTok and store in the database
     
     Uses the TikTokApi library to fetch trending videos and saves
     them to the PostgreSQL database. Handles duplicates via primary key.
+    
+    Returns:
+        Number of newly inserted videos (0 if nothing was stored)
     """
     # Check if MS_TOKEN is available
     ms_token = os.getenv("MS_TOKEN")
     if not ms_token:
         logger.error("MS_TOKEN missing. Please check your .env file.")
-        return
+        return 0
+
+    # One timestamp for every row and status update of this run
+    scrape_time = datetime.now()
 
     # Get browser configuration
     browser = os.getenv("TIKTOK_BROWSER", "chromium")
-    logger.info(f"Using browser: {browser}")
+    logger.info("Using browser: %s", browser)
     
     try:
         # Initialize TikTok API and create session
@@ -82,147 +376,36 @@ async def trending_videos():
             logger.info("TikTok API session created successfully")
             logger.info("Loading trending videos from TikTok...")
 
-            # Fetch and process trending videos
-            data = []
-            seen_video_ids = set()  # Track unique video IDs
-            video_count = 0
-
-            async for video in api.trending.videos(count=30):
-                try:
-                    info = video.as_dict
-                    video_id = info.get("id")
-                    
-                    # Skip if we've already seen this video in this batch
-                    if video_id in seen_video_ids:
-                        logger.debug(f"Skipping duplicate video: {video_id}")
-                        continue
-                        
-                    seen_video_ids.add(video_id)
-                    video_count += 1
-                    logger.debug(f"Processing video {video_count}: {video_id}")
-                    
-                    # Extract relevant data
-                    data.append({
-                        "id": video_id,
-                        "description": info.get("desc"),
-                        "author_username": info.get("author", {}).get("uniqueId"),
-                        "author_id": info.get("author", {}).get("id"),
-                        "likes": info.get("stats", {}).get("diggCount"),
-                        "shares": info.get("stats", {}).get("shareCount"),
-                        "comments": info.get("stats", {}).get("commentCount"),
-                        "plays": info.get("stats", {}).get("playCount"),
-                        "video_url": info.get("video", {}).get("downloadAddr"),
-                        "created_time": info.get("createTime"),
-                        "scraped_at": datetime.now()
-                    })
-                except Exception as e:
-                    logger.error(f"Error processing video: {str(e)}")
-                    logger.debug(traceback.format_exc())
-                    continue
-
-            if not data:
+            # Producer: resolve video details as the feed arrives and queue the rows;
+            # consumer: upsert them in batches while the producer keeps scraping
+            row_queue = asyncio.Queue(maxsize=ROW_QUEUE_SIZE)
+            producer = asyncio.create_task(produce_video_rows(api, row_queue, scrape_time))
+            consumer = asyncio.create_task(store_video_batches(row_queue))
+            try:
+                await asyncio.gather(producer, consumer)
+            except BaseException:
+                producer.cancel()
+                consumer.cancel()
+                raise
+
+            stored, inserted = consumer.result()
+            if not stored:
                 logger.warning("No videos found.")
-                return
-
-            logger.info(f"Found {len(data)} unique videos, attempting to store in database...")
-
-            # Store data in PostgreSQL
-            if data:
-                with get_db_connection() as conn:
-                    with conn.cursor() as cur:
-                        # Create table if it doesn't exist
-                        cur.execute("""
-                            CREATE TABLE IF NOT EXISTS public.tiktok_data (
-                                id VARCHAR(50),
-                                description TEXT,
-                                author_username VARCHAR(100),
-                                author_id VARCHAR(50),
-                                likes INTEGER,
-                                shares INTEGER,
-                                comments INTEGER,
-                                plays INTEGER,
-                                video_url TEXT,
-                                created_time BIGINT,
-                                scraped_at TIMESTAMP,
-                                PRIMARY KEY (id)
-                            )
-                        """)
-                        
-                        # Get count before insertion
-                        cur.execute("SELECT COUNT(*) FROM tiktok_data")
-                        count_before = cur.fetchone()[0]
-                        
-                        # Insert data with conflict handling
-                        inserted = 0
-                        updated = 0
-                        for post in data:
-                            try:
-                                cur.execute("""
-                                    INSERT INTO public.tiktok_data (
-                                        id, description, author_username, author_id,
-                                        likes, shares, comments, plays, video_url,
-                                        created_time, scraped_at
-                                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                                    ON CONFLICT (id) 
-                                    DO UPDATE SET 
-                                        likes = EXCLUDED.likes,
-                                        shares = EXCLUDED.shares,
-                                        comments = EXCLUDED.comments,
-                                        plays = EXCLUDED.plays,
-                                        scraped_at = EXCLUDED.scraped_at
-                                    RETURNING (xmax = 0) AS inserted
-                                """, (
-                                    post["id"],
-                                    post["description"],
-                                    post["author_username"],
-                                    post["author_id"],
-                                    post["likes"],
-                                    post["shares"],
-                                    post["comments"],
-                                    post["plays"],
-                                    post["video_url"],
-                                    post["created_time"],
-                                    post["scraped_at"]
-                                ))
-                                
-                                # Check if it was an insert or update
-                                result = cur.fetchone()
-                                if result[0]:
-                                    inserted += 1
-                                else:
-                                    updated += 1
-                                    
-                            except Exception as e:
-                                logger.error(f"Error inserting video {post['id']}: {str(e)}")
-                                continue
-                        
-                        # Commit changes and log results
-                        conn.commit()
-                        
-                        logger.info(f"Successfully processed TikTok videos: {inserted} new, {updated} updated")
-                        logger.info(f"Total videos in database: {count_before + inserted}")
+                return 0
+
+            logger.info("Stored %s unique TikTok videos", stored)
+            return inserted
 
     except Exception as e:
-        logger.error(f"Error in TikTok scraper: {str(e)}")
-        logger.error(traceback.format_exc())
+        logger.error("Error in TikTok scraper: %s", e)
+        logger.exception("Detailed error:")
         
         # Update status record to show error
         try:
-            with get_db_connection() as conn:
-                with conn.cursor() as cur:
-                    now = datetime.now()
-                    
-                    cur.execute("""
-                        INSERT INTO public.tiktok_data 
-                        (id, description, author_username, author_id, likes, shares, comments, plays, video_url, created_time, scraped_at)
-                        VALUES ('status_update', %s, 'TikTokScraper', '0', 0, 0, 0, 0, 'https://example.com', 0, %s)
-                        ON CONFLICT (id) DO UPDATE SET 
-                            description = EXCLUDED.description,
-                            scraped_at = EXCLUDED.scraped_at
-                    """, (f"Error: {str(e)}", now))
-                    conn.commit()
+            await asyncio.to_thread(write_error_status, f"Error: {str(e)}", scrape_time)
         except Exception as status_error:
-            logger.error(f"Error updating status: {str(status_error)}")
+            logger.error("Error updating status: %s", status_error)
+        return 0
 
 if __name__ == "__main__":
     asyncio.run(trending_videos())
\ No newline at end of file
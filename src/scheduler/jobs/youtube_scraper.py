@@ -1,12 +1,17 @@
+import atexit
+import queue
 import logging
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 from pathlib import Path
 from dotenv import load_dotenv
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 import os
+import csv
+import io
+import hashlib
 from datetime import datetime, timedelta
 import psycopg2
-from psycopg2.extras import execute_values
 
 # Load environment variables
 load_dotenv()
@@ -23,16 +28,31 @@ logger.setLevel(logging.INFO)
 # File handler with rotation
 log_handler = RotatingFileHandler(
     LOG_DIR / "youtube.log",
-    maxBytes=1024*1024,  # 1MB
+    maxBytes=10*1024*1024,  # 10MB
     backupCount=5
 )
 log_handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"))
-logger.addHandler(log_handler)
 
 # Console handler for immediate feedback
 console_handler = logging.StreamHandler()
 console_handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"))
-logger.addHandler(console_handler)
+
+class LocalQueueHandler(QueueHandler):
+    """QueueHandler that passes records to an in-process QueueListener unformatted"""
+    def prepare(self, record):
+        # QueueHandler.prepare() formats the message on the calling thread so that the
+        # record can be pickled; the listener runs in this process, so that is skipped
+        return record
+
+# Log calls only enqueue records; formatting and file/console I/O happen on the listener thread.
+# Attach only once, so re-importing the module does not duplicate every log line.
+if not logger.handlers:
+    log_queue = queue.Queue(-1)
+    logger.addHandler(LocalQueueHandler(log_queue))
+    log_listener = QueueListener(log_queue, log_handler, console_handler, respect_handler_level=True)
+    log_listener.start()
+    atexit.register(log_listener.stop)
+logger.propagate = False
 
 # Initialize YouTube API
 API_KEY = os.getenv("YT_KEY")
@@ -41,84 +61,167 @@ if not API_KEY:
     logger.error(error_msg)
     raise EnvironmentError("YT_KEY missing")
 
-youtube = build("youtube", "v3", developerKey=API_KEY)
+# Use the discovery document bundled with google-api-python-client (>= 2.0)
+# instead of downloading it from Google on every process start
+youtube = build("youtube", "v3", developerKey=API_KEY, static_discovery=True, cache_discovery=False)
+
+# Connection reused across scraper runs
+_conn = None
 
 def get_db_connection():
-    """Create a connection to the database specified in DATABASE_URL"""
+    """
+    Return a connection to the database specified in DATABASE_URL
+    
+    The connection is cached at module level and only re-established when it
+    was closed or fails a liveness check, so repeated runs skip the
+    connect/auth handshake.
+    """
+    global _conn
+    if _conn is not None and _conn.closed == 0:
+        try:
+            with _conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            _conn.rollback()
+            return _conn
+        except psycopg2.Error:
+            logger.warning("Cached database connection is no longer usable, reconnecting")
+            try:
+                _conn.close()
+            except psycopg2.Error:
+                pass
+    
     url = os.getenv("DATABASE_URL")
     if not url:
         raise ValueError("DATABASE_URL environment variable not set")
     
     try:
-        conn = psycopg2.connect(url)
-        return conn
+        _conn = psycopg2.connect(url)
+        return _conn
     except Exception as e:
-        logger.error(f"Database connection error: {str(e)}")
+        logger.error("Database connection error: %s", e)
         raise
 
-def should_scrape():
+# Set once the table exists, so the DDL runs only once per process
+_schema_ready = False
+
+def ensure_schema(conn):
+    """Create the YouTube table (partitioned by trending_date) and index if needed (once per process)"""
+    global _schema_ready
+    if _schema_ready:
+        return
+    
+    with conn.cursor() as cur:
+        # Create table if it doesn't exist
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS public.youtube_data (
+                video_id VARCHAR(50),
+                title TEXT,
+                description TEXT,
+                channel_title VARCHAR(255),
+                published_at TIMESTAMP,
+                view_count INTEGER,
+                like_count INTEGER,
+                comment_count INTEGER,
+                url TEXT,
+                scraped_at TIMESTAMP,
+                trending_date DATE,
+                PRIMARY KEY (video_id, trending_date)
+            ) PARTITION BY RANGE (trending_date)
+        """)
+        
+        # Index for the last-scrape check and the "latest activity" lookups
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_youtube_data_scraped_at ON public.youtube_data (scraped_at)")
+    conn.commit()
+    _schema_ready = True
+    ensure_partition(conn, datetime.now().date())
+
+# Months whose youtube_data partition is known to exist (or that need none)
+_partitions_ready = set()
+
+def ensure_partition(conn, day):
+    """
+    Create the monthly youtube_data partition that holds the given trending date
+    
+    Upserts and per-day lookups then only touch that month's (small) table and
+    index. Tables created before partitioning was introduced stay as they are.
+    """
+    month = day.replace(day=1)
+    if month in _partitions_ready:
+        return
+    
+    with conn.cursor() as cur:
+        cur.execute("SELECT relkind FROM pg_class WHERE oid = 'public.youtube_data'::regclass")
+        if cur.fetchone()[0] == 'p':
+            next_month = (month + timedelta(days=32)).replace(day=1)
+            cur.execute(f"""
+                CREATE TABLE IF NOT EXISTS public.youtube_data_{month:%Y%m}
+                PARTITION OF public.youtube_data
+                FOR VALUES FROM (%s) TO (%s)
+            """, (month, next_month))
+    conn.commit()
+    _partitions_ready.add(month)
+
+def should_scrape(conn):
     """Check if enough time has passed since the last scrape (6 hours)"""
     try:
-        with get_db_connection() as conn:
-            with conn.cursor() as cur:
-                # Create table if it doesn't exist
-                cur.execute("""
-                    CREATE TABLE IF NOT EXISTS youtube_data (
-                        video_id VARCHAR(50),
-                        title TEXT,
-                        description TEXT,
-                        channel_title VARCHAR(255),
-                        published_at TIMESTAMP,
-                        view_count INTEGER,
-                        like_count INTEGER,
-                        comment_count INTEGER,
-                        url TEXT,
-                        scraped_at TIMESTAMP,
-                        trending_date DATE,
-                        PRIMARY KEY (video_id, trending_date)
-                    )
-                """)
-                
-                cur.execute("SELECT MAX(scraped_at) as last_scrape FROM public.youtube_data")
-                result = cur.fetchone()
-                
-                if not result or not result[0]:
-                    return True
-                
-                last_scrape = result[0]
-                time_since_last = datetime.now() - last_scrape
-                
-                # Return True if it's been more than 6 hours since last scrape
-                return time_since_last > timedelta(hours=6)
+        with conn.cursor() as cur:
+            # Newest row via the scraped_at index instead of a MAX() over the table
+            cur.execute("""
+                SELECT scraped_at AS last_scrape FROM public.youtube_data
+                WHERE scraped_at IS NOT NULL
+                ORDER BY scraped_at DESC
+                LIMIT 1
+            """)
+            result = cur.fetchone()
+            
+            if not result or not result[0]:
+                return True
+            
+            last_scrape = result[0]
+            time_since_last = datetime.now() - last_scrape
+            
+            # Return True if it's been more than 6 hours since last scrape
+            return time_since_last > timedelta(hours=6)
     except Exception as e:
-        logger.warning(f"Error checking last scrape time: {e}")
+        logger.warning("Error checking last scrape time: %s", e)
+        conn.rollback()
         return True
 
-def update_status(error_message=None):
+def update_status(conn, error_message=None):
     """Update YouTube scraper status in the database"""
     try:
-        with get_db_connection() as conn:
-            with conn.cursor() as cur:
-                now = datetime.now()
-                today = now.date()
-                
-                description = f"YouTube API Error: {error_message}" if error_message else "YouTube Status Update"
-                
-                cur.execute("""
-                    INSERT INTO public.youtube_data 
-                    (video_id, title, description, channel_title, published_at, view_count, like_count, comment_count, url, scraped_at, trending_date)
-                    VALUES ('status_update', 'Status Update', %s, 'Scraper', %s, 0, 0, 0, 'https://example.com', %s, %s)
-                    ON CONFLICT (video_id, trending_date) DO UPDATE SET 
-                        description = EXCLUDED.description,
-                        scraped_at = EXCLUDED.scraped_at
-                """, (description, now, now, today))
-                conn.commit()
-                logger.info("YouTube status updated in database")
-                return True
+        with conn.cursor() as cur:
+            now = datetime.now()
+            today = now.date()
+            ensure_partition(conn, today)
+            
+            description = f"YouTube API Error: {error_message}" if error_message else "YouTube Status Update"
+            
+            cur.execute("""
+                INSERT INTO public.youtube_data 
+                (video_id, title, description, channel_title, published_at, view_count, like_count, comment_count, url, scraped_at, trending_date)
+                VALUES ('status_update', 'Status Update', %s, 'Scraper', %s, 0, 0, 0, 'https://example.com', %s, %s)
+                ON CONFLICT (video_id, trending_date) DO UPDATE SET 
+                    description = EXCLUDED.description,
+                    scraped_at = EXCLUDED.scraped_at
+            """, (description, now, now, today))
+        conn.commit()
+        logger.info("YouTube status updated in database")
+        return True
     except Exception as e:
-        logger.error(f"Error updating YouTube status: {str(e)}")
+        logger.error("Error updating YouTube status: %s", e)
+        conn.rollback()
         return False
 
+# ETag and content fingerprint of the last stored trending chart per (region, max_results, trending_date)
+_response_etags = {}
+_chart_fingerprints = {}
+
+def chart_fingerprint(videos):
+    """Return a short hash over the video IDs and statistics of a trending chart"""
+    content = ",".join(f"{row[0]}:{row[5]}:{row[6]}:{row[7]}" for row in videos)
+    return hashlib.blake2b(content.encode(), digest_size=16).hexdigest()
+
 def scrape_youtube_trending(region="DE", max_results=50):
     """
     Scrape trending videos from YouTube and store in the database
@@ -126,18 +229,33 @@ def scrape_youtube_trending(region="DE", max_results=50):
     Args:
         region: Country code for region-specific trends (default: DE)
         max_results: Maximum number of videos to fetch (default: 50)
+        
+    Returns:
+        Number of newly inserted videos (0 if skipped or failed)
     """
+    # One connection for the whole run (last-scrape check, insert and status updates)
+    try:
+        conn = get_db_connection()
+        ensure_schema(conn)
+    except Exception as e:
+        logger.error("YouTube scraper has no database connection: %s", e)
+        return 0
+    
     # Check if we should run scraping now
-    should_run = should_scrape()
+    should_run = should_scrape(conn)
     if not should_run:
         logger.info("Skipping scrape - not enough time has passed since last scrape")
-        update_status()
-        return
+        update_status(conn)
+        return 0
     
-    logger.info(f"Starting YouTube scraping for region {region}, looking for {max_results} videos...")
+    logger.info("Starting YouTube scraping for region %s, looking for %s videos...", region, max_results)
         
+    scrape_time = datetime.now()
+    today_date = scrape_time.date()
+    etag_key = (region, max_results, today_date)
+    
     try:
-        # Fetch videos from YouTube API
+        # Fetch videos from YouTube API; a known ETag lets YouTube answer 304 if the chart is unchanged
         try:
             request = youtube.videos().list(
                 part="snippet,statistics",
@@ -145,118 +263,130 @@ def scrape_youtube_trending(region="DE", max_results=50):
                 regionCode=region,
                 maxResults=max_results
             )
+            if etag_key in _response_etags:
+                request.headers["If-None-Match"] = _response_etags[etag_key]
             response = request.execute()
             logger.info("Successfully fetched trending videos from YouTube API")
+        except HttpError as e:
+            if e.resp.status == 304:
+                logger.info("Trending videos unchanged since the last scrape, skipping database write")
+                update_status(conn)
+                return 0
+            error_msg = f"Error fetching trending videos from YouTube API: {str(e)}"
+            logger.error(error_msg)
+            update_status(conn, str(e))
+            return 0
         except Exception as e:
             error_msg = f"Error fetching trending videos from YouTube API: {str(e)}"
             logger.error(error_msg)
-            update_status(str(e))
-            return
+            update_status(conn, str(e))
+            return 0
 
         # Process video data
         videos = []
-        scrape_time = datetime.now()
-        today_date = scrape_time.date()
 
         for item in response.get("items", []):
             snippet = item["snippet"]
             stats = item.get("statistics", {})
 
-            videos.append({
-                "video_id": item["id"],
-                "title": snippet.get("title"),
-                "description": snippet.get("description"),
-                "channel_title": snippet.get("channelTitle"),
-                "published_at": snippet.get("publishedAt"),
-                "view_count": int(stats.get("viewCount", 0)),
-                "like_count": int(stats.get("likeCount", 0)),
-                "comment_count": int(stats.get("commentCount", 0)),
-                "url": f"https://www.youtube.com/watch?v={item['id']}",
-                "scraped_at": scrape_time,
-                "trending_date": today_date
-            })
+            # Row tuple in youtube_data column order, written to the COPY buffer as is
+            videos.append((
+                item["id"],
+                snippet.get("title"),
+                snippet.get("description"),
+                snippet.get("channelTitle"),
+                snippet.get("publishedAt"),
+                int(stats.get("viewCount", 0)),
+                int(stats.get("likeCount", 0)),
+                int(stats.get("commentCount", 0)),
+                f"https://www.youtube.com/watch?v={item['id']}",
+                scrape_time,
+                today_date
+            ))
 
         video_count = len(videos)
-        logger.info(f"Found {video_count} trending videos")
+        logger.info("Found %s trending videos", video_count)
+
+        # Same videos with the same statistics as the last stored chart: nothing to write
+        fingerprint = chart_fingerprint(videos)
+        if _chart_fingerprints.get(etag_key) == fingerprint:
+            logger.info("Trending chart identical to the last stored one, skipping database write")
+            update_status(conn)
+            return 0
 
         # Store videos in database
+        new_videos = 0
         if videos:
-            with get_db_connection() as conn:
+            ensure_partition(conn, today_date)
+            with conn:
                 with conn.cursor() as cur:
-                    # Create table if it doesn't exist (redundant but safe)
+                    # Stream the videos into a transaction-scoped staging table with COPY
+                    buffer = io.StringIO()
+                    csv.writer(buffer).writerows(videos)
+                    buffer.seek(0)
                     cur.execute("""
-                        CREATE TABLE IF NOT EXISTS youtube_data (
-                            video_id VARCHAR(50),
-                            title TEXT,
-                            description TEXT,
-                            channel_title VARCHAR(255),
-                            published_at TIMESTAMP,
-                            view_count INTEGER,
-                            like_count INTEGER,
-                            comment_count INTEGER,
-                            url TEXT,
-                            scraped_at TIMESTAMP,
-                            trending_date DATE,
-                            PRIMARY KEY (video_id, trending_date)
-                        )
+                        CREATE TEMP TABLE youtube_data_stage
+                        (LIKE public.youtube_data INCLUDING DEFAULTS) ON COMMIT DROP
                     """)
-                    
-                    # Get count before insertion
-                    cur.execute("SELECT COUNT(*) FROM youtube_data WHERE trending_date = %s", (today_date,))
-                    count_before = cur.fetchone()[0]
-                    
-                    # Insert data with conflict handling
-                    insert_query = """
-                        INSERT INTO youtube_data (
+                    cur.copy_expert("""
+                        COPY youtube_data_stage (
                             video_id, title, description, channel_title,
                             published_at, view_count, like_count, comment_count,
                             url, scraped_at, trending_date
                         )
-                        VALUES %s
-                        ON CONFLICT (video_id, trending_date) 
-                        DO UPDATE SET 
-                            view_count = EXCLUDED.view_count,
-                            like_count = EXCLUDED.like_count,
-                            comment_count = EXCLUDED.comment_count,
-                            scraped_at = EXCLUDED.scraped_at
-                    """
-                    
-                    values = [(
-                        video["video_id"],
-                        video["title"],
-                        video["description"],
-                        video["channel_title"],
-                        video["published_at"],
-                        video["view_count"],
-                        video["like_count"],
-                        video["comment_count"],
-                        video["url"],
-                        video["scraped_at"],
-                        video["trending_date"]
-                    ) for video in videos]
-                    
-                    execute_values(cur, insert_query, values)
+                        FROM STDIN WITH (FORMAT csv, FORCE_NOT_NULL (title, description))
+                    """, buffer)
                     
-                    # Get count after insertion
-                    cur.execute("SELECT COUNT(*) FROM youtube_data WHERE trending_date = %s", (today_date,))
-                    count_after = cur.fetchone()[0]
+                    # Merge staged rows into youtube_data with conflict handling
+                    cur.execute("""
+                        WITH merged AS (
+                            INSERT INTO youtube_data (
+                                video_id, title, description, channel_title,
+                                published_at, view_count, like_count, comment_count,
+                                url, scraped_at, trending_date
+                            )
+                            SELECT video_id, title, description, channel_title,
+                                   published_at, view_count, like_count, comment_count,
+                                   url, scraped_at, trending_date
+                            FROM youtube_data_stage
+                            ON CONFLICT (video_id, trending_date) 
+                            DO UPDATE SET 
+                                view_count = EXCLUDED.view_count,
+                                like_count = EXCLUDED.like_count,
+                                comment_count = EXCLUDED.comment_count,
+                                scraped_at = EXCLUDED.scraped_at
+                            RETURNING (xmax = 0) AS inserted
+                        )
+                        SELECT count(*) FILTER (WHERE inserted), count(*) FROM merged
+                    """)
                     
-                    # Calculate new insertions
-                    new_videos = count_after - count_before
-                    updated_videos = video_count - new_videos
+                    # New vs. updated rows are counted by the merge itself, one row comes back
+                    new_videos, total = cur.fetchone()
+                    updated_videos = total - new_videos
                     
                     conn.commit()
                     
-                    logger.info(f"Inserted {new_videos} new videos and updated {updated_videos} existing videos in the database")
+                    logger.info("Inserted %s new videos and updated %s existing videos in the database", new_videos, updated_videos)
 
-            logger.info(f"Successfully stored {video_count} YouTube videos in the database")
+            logger.info("Successfully stored %s YouTube videos in the database", video_count)
+
+        # Remember ETag and fingerprint of the stored chart for the next run
+        if response.get("etag"):
+            _response_etags[etag_key] = response["etag"]
+        _chart_fingerprints[etag_key] = fingerprint
+        return new_videos
 
     except Exception as e:
         error_msg = f"Error during YouTube scraping: {e}"
         logger.error(error_msg)
         logger.exception("Detailed error:")
-        # Update status on errors
-        update_status(str(e))
+        # Update status on errors; the connection itself may be what broke
+        try:
+            conn.rollback()
+            update_status(conn, str(e))
+        except psycopg2.Error as status_error:
+            logger.error("Error updating status: %s", status_error)
+        return 0
 
 if __name__ == "__main__":
     scrape_youtube_trending()
@@ -1,17 +1,19 @@
 import os
 import time
+import atexit
+import queue
 import logging
-from logging.handlers import RotatingFileHandler
-from datetime import datetime
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
+from datetime import datetime, timedelta
 import psycopg2
 from pathlib import Path
 from dotenv import load_dotenv
 import asyncio
 
 # Import scraper modules
-from jobs.reddit_scraper import scrape_reddit
-from jobs.tiktok_scraper import trending_videos as scrape_tiktok_async
-from jobs.youtube_scraper import scrape_youtube_trending
+from jobs.reddit_scraper import scrape_reddit, ensure_schema as ensure_reddit_schema
+from jobs.tiktok_scraper import trending_videos as scrape_tiktok_async, ensure_schema as ensure_tiktok_schema
+from jobs.youtube_scraper import scrape_youtube_trending, ensure_schema as ensure_youtube_schema, ensure_partition
 
 # Load environment variables
 load_dotenv()
@@ -28,95 +30,113 @@ logger.setLevel(logging.INFO)
 # File handler with rotation
 log_handler = RotatingFileHandler(
     LOG_DIR / "scraper.log",
-    maxBytes=1024*1024,  # 1MB
+    maxBytes=10*1024*1024,  # 10MB
     backupCount=5
 )
 log_handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"))
-logger.addHandler(log_handler)
 
 # Console handler for immediate feedback
 console_handler = logging.StreamHandler()
 console_handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"))
-logger.addHandler(console_handler)
+
+class LocalQueueHandler(QueueHandler):
+    """QueueHandler that passes records to an in-process QueueListener unformatted"""
+    def prepare(self, record):
+        # QueueHandler.prepare() formats the message on the calling thread so that the
+        # record can be pickled; the listener runs in this process, so that is skipped
+        return record
+
+# Log calls only enqueue records; formatting and file/console I/O happen on the listener thread.
+# Attach only once, so re-importing the module does not duplicate every log line.
+if not logger.handlers:
+    log_queue = queue.Queue(-1)
+    logger.addHandler(LocalQueueHandler(log_queue))
+    log_listener = QueueListener(log_queue, log_handler, console_handler, respect_handler_level=True)
+    log_listener.start()
+    atexit.register(log_listener.stop)
+logger.propagate = False
+
+# Connection reused across scheduler cycles
+_conn = None
 
 def get_db_connection():
-    """Create a connection to the database specified in DATABASE_URL"""
+    """
+    Return a connection to the database specified in DATABASE_URL
+    
+    The connection is cached at module level and only re-established when it
+    was closed or fails a liveness check, so the stats and heartbeat queries
+    of every cycle skip the connect/auth handshake.
+    """
+    global _conn
+    if _conn is not None and _conn.closed == 0:
+        try:
+            with _conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            _conn.rollback()
+            return _conn
+        except psycopg2.Error:
+            logger.warning("Cached database connection is no longer usable, reconnecting")
+            try:
+                _conn.close()
+            except psycopg2.Error:
+                pass
+    
     url = os.getenv("DATABASE_URL")
     if not url:
         raise ValueError("DATABASE_URL environment variable not set")
     
     try:
-        conn = psycopg2.connect(url)
-        return conn
+        _conn = psycopg2.connect(url)
+        return _conn
     except Exception as e:
         logger.error(f"Failed to connect to database: {str(e)}")
         raise
 
-def get_table_count(table_name):
-    """
-    Get the number of records in a table
-    
-    Args:
-        table_name: Name of the database table
-        
-    Returns:
-        Count of records in the table
-    """
-    try:
-        with get_db_connection() as conn:
-            with conn.cursor() as cur:
-                cur.execute(f"SELECT COUNT(*) FROM public.{table_name}")
-                return cur.fetchone()[0]
-    except Exception as e:
-        logger.error(f"Error getting count for {table_name}: {str(e)}")
-        return 0
+# Tables written by the scrapers; table names are interpolated into SQL, so only these are accepted
+SCRAPER_TABLES = ("reddit_data", "tiktok_data", "youtube_data")
+
+def check_table_name(table_name):
+    """Raise ValueError unless table_name is one of SCRAPER_TABLES"""
+    if table_name not in SCRAPER_TABLES:
+        raise ValueError(f"Unknown scraper table: {table_name}")
 
-def update_activity_timestamp(table_name):
+# Row estimate of a table from the planner statistics: a catalog lookup instead of a
+# full scan. Partitioned tables (youtube_data) have no rows of their own, so their
+# partitions are summed.
+ESTIMATE_SQL = """
+    (SELECT COALESCE(SUM(GREATEST(reltuples, 0)), 0)::bigint FROM pg_class
+     WHERE relkind = 'r' AND (
+         oid = 'public.{table}'::regclass
+         OR oid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = 'public.{table}'::regclass)
+     ))
+"""
+
+def print_database_stats(precise=False):
     """
-    Update the scraped_at timestamp for the most recent record
+    Get and log current database statistics
     
-    This helps the frontend recognize that the scraper is active
+    By default the counts are the planner's row estimates (kept current by
+    autovacuum), which cost a catalog lookup regardless of table size.
     
     Args:
-        table_name: Name of the database table
-        
-    Returns:
-        True if successful, False otherwise
-    """
-    try:
-        with get_db_connection() as conn:
-            with conn.cursor() as cur:
-                now = datetime.now()
-                cur.execute(f"""
-                    UPDATE public.{table_name} 
-                    SET scraped_at = %s 
-                    WHERE id IN (
-                        SELECT id FROM public.{table_name} 
-                        ORDER BY scraped_at DESC 
-                        LIMIT 1
-                    )
-                """, (now,))
-                conn.commit()
-                logger.info(f"Activity timestamp updated for {table_name}")
-                return True
-    except Exception as e:
-        logger.error(f"Error updating activity timestamp for {table_name}: {str(e)}")
-        return False
-
-def print_database_stats():
-    """
-    Get and log current database statistics
+        precise: Use exact COUNT(*) queries instead (full scans, for debugging)
     
     Returns:
         Tuple of (reddit_count, tiktok_count, youtube_count)
     """
+    if precise:
+        columns = [f"(SELECT COUNT(*) FROM public.{table})" for table in SCRAPER_TABLES]
+    else:
+        columns = [ESTIMATE_SQL.format(table=table) for table in SCRAPER_TABLES]
+    
     try:
-        # Get counts for each platform
-        reddit_count = get_table_count("reddit_data")
-        tiktok_count = get_table_count("tiktok_data") 
-        youtube_count = get_table_count("youtube_data")
+        # Get counts for each platform in a single round-trip
+        with get_db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(f"SELECT {', '.join(columns)}")
+                reddit_count, tiktok_count, youtube_count = cur.fetchone()
         
-        logger.info("Current Database Stats:")
+        logger.info("Current Database Stats:" if precise else "Current Database Stats (estimate):")
         logger.info(f"- Reddit posts: {reddit_count}")
         logger.info(f"- TikTok videos: {tiktok_count}")
         logger.info(f"- YouTube videos: {youtube_count}")
@@ -126,201 +146,279 @@ def print_database_stats():
         logger.error(f"Error getting database stats: {str(e)}")
         return 0, 0, 0
 
-def force_update_activity_timestamp():
+# Heartbeat statements per platform as (table, update of the newest row, status row insert).
+# The newest row is found via the scraped_at indexes; reddit/tiktok address it by ctid,
+# youtube_data by its primary key since ctids repeat across partitions.
+HEARTBEAT_STATEMENTS = [
+    (
+        "reddit_data",
+        """
+            UPDATE public.reddit_data 
+            SET scraped_at = $1 
+            WHERE ctid = (
+                SELECT ctid FROM public.reddit_data 
+                ORDER BY scraped_at DESC 
+                LIMIT 1
+            )
+        """,
+        """
+            INSERT INTO public.reddit_data 
+            (id, title, text, author, score, created_utc, num_comments, url, subreddit, scraped_at)
+            VALUES ('status_update', 'Status Update', 'Automatically generated', 'Scraper', 0, 0, 0, 
+                    'https://example.com', 'status', $1)
+            ON CONFLICT (id) DO UPDATE SET scraped_at = EXCLUDED.scraped_at
+        """
+    ),
+    (
+        "tiktok_data",
+        """
+            UPDATE public.tiktok_data 
+            SET scraped_at = $1 
+            WHERE ctid = (
+                SELECT ctid FROM public.tiktok_data 
+                ORDER BY scraped_at DESC 
+                LIMIT 1
+            )
+        """,
+        """
+            INSERT INTO public.tiktok_data 
+            (id, description, author_username, author_id, likes, shares, comments, plays, video_url, created_time, scraped_at)
+            VALUES ('status_update', 'Status Update', 'Scraper', '0', 0, 0, 0, 0, 'https://example.com', 0, $1)
+            ON CONFLICT (id) DO UPDATE SET scraped_at = EXCLUDED.scraped_at
+        """
+    ),
+    (
+        "youtube_data",
+        """
+            UPDATE public.youtube_data 
+            SET scraped_at = $1 
+            WHERE (video_id, trending_date) = (
+                SELECT video_id, trending_date FROM public.youtube_data 
+                ORDER BY scraped_at DESC 
+                LIMIT 1
+            )
+        """,
+        """
+            INSERT INTO public.youtube_data 
+            (video_id, title, description, channel_title, published_at, view_count, like_count, comment_count, url, scraped_at, trending_date)
+            VALUES ('status_update', 'Status Update', 'Automatically generated', 'Scraper', $1, 0, 0, 0, 'https://example.com', $1, $1::date)
+            ON CONFLICT (video_id, trending_date) DO UPDATE SET scraped_at = EXCLUDED.scraped_at
+        """
+    )
+]
+
+# Connection the heartbeat statements were prepared on
+_prepared_conn = None
+
+def prepare_heartbeat_statements(conn, cur):
+    """Prepare the heartbeat statements once per connection so every cycle skips parsing and planning"""
+    global _prepared_conn
+    if _prepared_conn is conn:
+        return
+    
+    # Drop statements left by an earlier attempt that failed partway (this connection
+    # only holds the heartbeat statements), so PREPARE cannot hit "already exists"
+    cur.execute("DEALLOCATE ALL")
+    
+    # All three updates in one statement; it returns how many rows each one touched.
+    # Parameters $2.. switch the update of the corresponding table on or off.
+    touched = [f"{table}_touched" for table, _, _ in HEARTBEAT_STATEMENTS]
+    ctes = ",\n".join(
+        f"{name} AS ({update_sql} AND ${i + 2} RETURNING 1)"
+        for i, (name, (_, update_sql, _)) in enumerate(zip(touched, HEARTBEAT_STATEMENTS))
+    )
+    counts = ", ".join(f"(SELECT count(*) FROM {name})" for name in touched)
+    flags = ", ".join("boolean" for _ in HEARTBEAT_STATEMENTS)
+    cur.execute(f"PREPARE heartbeat_update (timestamp, {flags}) AS WITH {ctes} SELECT {counts}")
+    
+    for table, _, insert_sql in HEARTBEAT_STATEMENTS:
+        cur.execute(f"PREPARE {table}_heartbeat_insert (timestamp) AS {insert_sql}")
+    _prepared_conn = conn
+
+def force_update_activity_timestamp(tables=SCRAPER_TABLES, now=None):
     """
-    Update scraped_at timestamp in all tables to ensure scraper appears active
+    Update scraped_at timestamp in the given tables to ensure scraper appears active
+    
+    The newest row of every requested table is touched in a single round-trip.
+    If a table has no records, a status record is created in it.
     
-    If no records exist, creates a status record in each table
+    Args:
+        tables: Tables to touch (subset of SCRAPER_TABLES, default: all)
+        now: Timestamp to write (default: current time)
     """
+    for table in tables:
+        check_table_name(table)
+    if not tables:
+        return True
+    
     try:
         with get_db_connection() as conn:
             with conn.cursor() as cur:
-                now = datetime.now()
-                today = now.date()
+                if now is None:
+                    now = datetime.now()
+                # youtube_data is partitioned by month; the status record may need this month's
+                # partition if nothing was scraped since the month began (commits on its own)
+                if "youtube_data" in tables:
+                    ensure_partition(conn, now.date())
+                prepare_heartbeat_statements(conn, cur)
                 
-                # Update or create status records for each platform
-                platform_tables = [
-                    {
-                        "name": "reddit_data",
-                        "insert_sql": """
-                            INSERT INTO public.reddit_data 
-                            (id, title, text, author, score, created_utc, num_comments, url, subreddit, scraped_at)
-                            VALUES ('status_update', 'Status Update', 'Automatically generated', 'Scraper', 0, 0, 0, 
-                                    'https://example.com', 'status', %s)
-                            ON CONFLICT (id) DO UPDATE SET scraped_at = EXCLUDED.scraped_at
-                        """,
-                        "update_sql": """
-                            UPDATE public.reddit_data 
-                            SET scraped_at = %s 
-                            WHERE id IN (
-                                SELECT id FROM public.reddit_data 
-                                ORDER BY scraped_at DESC 
-                                LIMIT 1
-                            )
-                        """
-                    },
-                    {
-                        "name": "tiktok_data",
-                        "insert_sql": """
-                            INSERT INTO public.tiktok_data 
-                            (id, description, author_username, author_id, likes, shares, comments, plays, video_url, created_time, scraped_at)
-                            VALUES ('status_update', 'Status Update', 'Scraper', '0', 0, 0, 0, 0, 'https://example.com', 0, %s)
-                            ON CONFLICT (id) DO UPDATE SET scraped_at = EXCLUDED.scraped_at
-                        """,
-                        "update_sql": """
-                            UPDATE public.tiktok_data 
-                            SET scraped_at = %s 
-                            WHERE id IN (
-                                SELECT id FROM public.tiktok_data 
-                                ORDER BY scraped_at DESC 
-                                LIMIT 1
-                            )
-                        """
-                    },
-                    {
-                        "name": "youtube_data",
-                        "insert_sql": """
-                            INSERT INTO public.youtube_data 
-                            (video_id, title, description, channel_title, published_at, view_count, like_count, comment_count, url, scraped_at, trending_date)
-                            VALUES ('status_update', 'Status Update', 'Automatically generated', 'Scraper', %s, 0, 0, 0, 'https://example.com', %s, %s)
-                            ON CONFLICT (video_id, trending_date) DO UPDATE SET scraped_at = EXCLUDED.scraped_at
-                        """,
-                        "update_sql": """
-                            UPDATE public.youtube_data 
-                            SET scraped_at = %s 
-                            WHERE video_id IN (
-                                SELECT video_id FROM public.youtube_data 
-                                ORDER BY scraped_at DESC 
-                                LIMIT 1
-                            )
-                        """
-                    }
-                ]
+                # Update the newest record of the requested platforms at once
+                selected = [table in tables for table, _, _ in HEARTBEAT_STATEMENTS]
+                placeholders = ", ".join("%s" for _ in selected)
+                cur.execute(f"EXECUTE heartbeat_update (%s, {placeholders})", (now, *selected))
+                rows_updated = cur.fetchone()
                 
-                # Process each platform
-                for platform in platform_tables:
-                    try:
-                        # Try to update existing record
-                        if platform["name"] == "youtube_data":
-                            cur.execute(platform["update_sql"], (now,))
-                        else:
-                            cur.execute(platform["update_sql"], (now,))
-                            
-                        rows_updated = cur.rowcount
-                        
-                        # If no records updated, insert a new status record
-                        if rows_updated == 0:
-                            if platform["name"] == "youtube_data":
-                                cur.execute(platform["insert_sql"], (now, now, today))
-                            else:
-                                cur.execute(platform["insert_sql"], (now,))
-                                
-                    except Exception as e:
-                        logger.error(f"Error updating timestamp for {platform['name']}: {str(e)}")
+                # Insert a status record where no record was updated
+                for (table, _, _), wanted, updated in zip(HEARTBEAT_STATEMENTS, selected, rows_updated):
+                    if wanted and updated == 0:
+                        cur.execute(f"EXECUTE {table}_heartbeat_insert (%s)", (now,))
                 
                 conn.commit()
-                logger.info("Activity timestamps updated for all tables")
+                logger.info(f"Activity timestamps updated for {', '.join(tables)}")
                 return True
     except Exception as e:
         logger.error(f"Error updating activity timestamps: {str(e)}")
         return False
 
-def run_scrapers():
+async def run_scrapers():
     """
-    Run all scrapers (Reddit, TikTok, YouTube) and log results
+    Run all scrapers (Reddit, TikTok, YouTube) concurrently and log results
     
-    Each scraper runs independently, and failures in one scraper
-    don't prevent other scrapers from running
+    Reddit and YouTube block on network and database I/O and run in worker
+    threads, TikTok runs on the event loop. Each scraper runs independently,
+    and failures in one scraper don't prevent other scrapers from running
     """
     try:
         logger.info("Starting scraping cycle...")
-        start_time = datetime.now()
+        # Monotonic clock for the duration, so clock adjustments cannot distort it
+        start_time = time.monotonic()
         
-        # Get initial counts
-        initial_reddit, initial_tiktok, initial_youtube = print_database_stats()
+        # Run scrapers concurrently; return_exceptions keeps one failure from cancelling the others.
+        # Every scraper returns the number of rows it inserted, so no counts are needed beforehand.
+        logger.info("Running Reddit, TikTok and YouTube scrapers...")
+        reddit_result, tiktok_result, youtube_result = await asyncio.gather(
+            asyncio.to_thread(scrape_reddit),
+            scrape_tiktok_async(),
+            asyncio.to_thread(scrape_youtube_trending),
+            return_exceptions=True
+        )
         
-        # Run scrapers
-        reddit_success = False
-        tiktok_success = False
-        youtube_success = False
-        
-        # Run Reddit scraper
-        try:
-            logger.info("Running Reddit scraper...")
-            scrape_reddit()
-            reddit_success = True
-        except Exception as e:
-            logger.error(f"Reddit scraper error: {str(e)}")
-        
-        # Run TikTok scraper (async)
-        try:
-            logger.info("Running TikTok scraper...")
-            asyncio.run(scrape_tiktok_async())
-            tiktok_success = True
-        except Exception as e:
-            logger.error(f"TikTok scraper error: {str(e)}")
-            logger.exception("Detailed error:")
-        
-        # Run YouTube scraper
-        try:
-            logger.info("Running YouTube scraper...")
-            scrape_youtube_trending()
-            youtube_success = True
-        except Exception as e:
-            logger.error(f"YouTube scraper error: {str(e)}")
-        
-        # Get final counts and calculate differences
-        final_reddit, final_tiktok, final_youtube = print_database_stats()
+        reddit_inserted = tiktok_inserted = youtube_inserted = 0
+        if isinstance(reddit_result, Exception):
+            logger.error(f"Reddit scraper error: {str(reddit_result)}")
+        else:
+            reddit_inserted = reddit_result or 0
+        if isinstance(tiktok_result, Exception):
+            logger.error(f"TikTok scraper error: {str(tiktok_result)}")
+            logger.error("Detailed error:", exc_info=tiktok_result)
+        else:
+            tiktok_inserted = tiktok_result or 0
+        if isinstance(youtube_result, Exception):
+            logger.error(f"YouTube scraper error: {str(youtube_result)}")
+        else:
+            youtube_inserted = youtube_result or 0
         
         logger.info("\nScraping Results:")
-        logger.info(f"Reddit: +{final_reddit - initial_reddit} posts (Total: {final_reddit})")
-        logger.info(f"TikTok: +{final_tiktok - initial_tiktok} videos (Total: {final_tiktok})")
-        logger.info(f"YouTube: +{final_youtube - initial_youtube} videos (Total: {final_youtube})")
+        logger.info(f"Reddit: +{reddit_inserted} posts")
+        logger.info(f"TikTok: +{tiktok_inserted} videos")
+        logger.info(f"YouTube: +{youtube_inserted} videos")
+        
+        # Table sizes from the planner statistics (psycopg2 blocks, so the stats and
+        # heartbeat queries run in a worker thread)
+        await asyncio.to_thread(print_database_stats)
         
-        # Always update activity timestamps
-        force_update_activity_timestamp()
+        # Tables that received new rows already carry a fresh scraped_at; only touch the others
+        idle_tables = [
+            table for table, inserted in zip(SCRAPER_TABLES, (reddit_inserted, tiktok_inserted, youtube_inserted))
+            if not inserted
+        ]
+        if idle_tables:
+            # Local time like the scrapers' scraped_at values (TIMESTAMP without time zone)
+            await asyncio.to_thread(force_update_activity_timestamp, idle_tables, datetime.now())
         
         # Log completion time
-        duration = (datetime.now() - start_time).total_seconds()
+        duration = time.monotonic() - start_time
         logger.info(f"Scraping cycle completed in {duration:.2f} seconds")
         
     except Exception as e:
         logger.error(f"Error in scraping cycle: {str(e)}")
         logger.exception("Detailed error:")
 
+def get_last_scrape_time():
+    """
+    Return the newest scraped_at across all scraper tables (None if unknown)
+    
+    One round-trip; every MAX is answered from the scraped_at index of its table.
+    """
+    columns = ", ".join(f"(SELECT MAX(scraped_at) FROM public.{table})" for table in SCRAPER_TABLES)
+    try:
+        with get_db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(f"SELECT GREATEST({columns})")
+                return cur.fetchone()[0]
+    except Exception as e:
+        logger.error(f"Error getting last scrape time: {str(e)}")
+        return None
+
+def next_quarter_hour(now):
+    """Return the next full quarter hour after now (rolls over hours and days)"""
+    start_of_slot = now.replace(minute=now.minute - now.minute % 15, second=0, microsecond=0)
+    return start_of_slot + timedelta(minutes=15)
+
+async def run_schedule():
+    """
+    Run the scraping cycle immediately, then at every full quarter hour
+    
+    The immediate run is skipped if the last scrape is less than 15 minutes
+    old (e.g. after a restart), the next run then happens at the next quarter
+    hour. Waiting happens in asyncio.sleep, so the scrape cycles and any further
+    periodic jobs share one event loop instead of blocking in time.sleep.
+    """
+    last_scrape = await asyncio.to_thread(get_last_scrape_time)
+    if last_scrape is not None and datetime.now() - last_scrape < timedelta(minutes=15):
+        logger.info(f"Last scrape at {last_scrape.strftime('%Y-%m-%d %H:%M:%S')}, skipping the initial run")
+    else:
+        await run_scrapers()
+    
+    while True:
+        now = datetime.now()
+        next_run = next_quarter_hour(now)
+        sleep_seconds = (next_run - now).total_seconds()
+        if sleep_seconds <= 0:
+            sleep_seconds = 15 * 60  # Default to 15 minutes if calculation fails
+            
+        logger.info(f"Next scrape cycle scheduled for: {next_run.strftime('%Y-%m-%d %H:%M:%S')}")
+        logger.info(f"Sleeping for {sleep_seconds:.0f} seconds")
+        
+        await asyncio.sleep(sleep_seconds)
+        await run_scrapers()
+        
+        # Fixed-rate schedule: a cycle that runs past its slot skips ahead instead of queueing up
+        if datetime.now() >= next_run + timedelta(minutes=15):
+            logger.warning("Scrape cycle overran its 15 minute slot, continuing at the next quarter hour")
+
 def main():
     """
     Main scheduler function - runs scrapers periodically
     
-    Executes scrapers immediately on start, then runs them
-    every 15 minutes in a continuous loop
+    Executes scrapers immediately on start (unless the last scrape is
+    less than 15 minutes old), then runs them every 15 minutes in a
+    continuous loop
     """
     logger.info("Starting main scraper scheduler...")
     
     try:
-        # Run scrapers immediately on start
-        run_scrapers()
+        # Create tables and indexes once at startup instead of on every scrape
+        try:
+            with get_db_connection() as conn:
+                ensure_reddit_schema(conn)
+                ensure_tiktok_schema(conn)
+                ensure_youtube_schema(conn)
+        except Exception as e:
+            logger.error(f"Error preparing database schema: {str(e)}")
         
-        # Then run in a loop with 15 minute intervals
-        while True:
-            next_run = datetime.now()
-            next_run = next_run.replace(
-                minute=((next_run.minute // 15) + 1) * 15 % 60,
-                second=0,
-                microsecond=0
-            )
-            if next_run.minute == 0:
-                next_run = next_run.replace(hour=next_run.hour + 1)
-                
-            sleep_seconds = (next_run - datetime.now()).total_seconds()
-            if sleep_seconds <= 0:
-                sleep_seconds = 15 * 60  # Default to 15 minutes if calculation fails
-                
-            logger.info(f"Next scrape cycle scheduled for: {next_run.strftime('%Y-%m-%d %H:%M:%S')}")
-            logger.info(f"Sleeping for {sleep_seconds:.0f} seconds")
-            
-            time.sleep(sleep_seconds)
-            run_scrapers()
+        # Run scrapers now and then every 15 minutes on one event loop
+        asyncio.run(run_schedule())
             
     except KeyboardInterrupt:
         logger.info("Scraper scheduler stopped by user")